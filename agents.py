@@ -1,23 +1,127 @@
 from __future__ import annotations
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, AsyncIterator, Tuple, Union
+import asyncio
 import datetime as dt
+import os
 import re
+import types
 
-import dateparser
 from pydantic import BaseModel
 
 from config import settings
 from tools.amadeus import AmadeusFlightTool
+from tools.images import generate_city_image_1024_async
+from tools.response_cache import ResponseCache, cache_key
+from tools.batcher import AsyncBatcher
+from tools.http import openai_client, anthropic_client
+from tools.limits import OPENAI_LIMIT, ANTHROPIC_LIMIT
 
 try:
-    from openai import OpenAI
+    import ahocorasick
 except Exception:
-    OpenAI = None
+    ahocorasick = None
 
-try:
-    import anthropic
-except Exception:
-    anthropic = None
+
+_RANGE_RE = re.compile(r"(\d{1,2} [a-zçğıöşü]+).*?(\d{1,2} [a-zçğıöşü]+)")
+# Alt-dize eşleşmesi bilerek korunuyor ("uçuş", "flights" da yakalansın).
+_KW_RE = re.compile(r"uç|flight|bilet|fly")
+_SEGMENT_RE = re.compile(r"^\s*⟦(\d+)⟧\s*$", re.MULTILINE)
+# Saf uçuş listesinin ötesine geçen istekler (soru, ek kısıt, sohbet) GPT'ye gider.
+_AMBIGUOUS_RE = re.compile(
+    r"\?|\b(why|how|what|which|should|recommend|compare|hotel|visa|weather|baggage|luggage|"
+    r"neden|nasıl|hangi|öner|karşılaştır|otel|vize|bagaj)\b"
+)
+
+
+# ---------- Hızlı tarih ayrıştırma (TR/EN dar gramer) ----------
+_MONTHS_TR = {
+    "ocak": 1, "şubat": 2, "mart": 3, "nisan": 4, "mayıs": 5, "haziran": 6,
+    "temmuz": 7, "ağustos": 8, "eylül": 9, "ekim": 10, "kasım": 11, "aralık": 12,
+}
+_MONTHS_EN = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_WEEKDAYS_TR = {"pazartesi": 0, "salı": 1, "çarşamba": 2, "perşembe": 3, "cuma": 4, "cumartesi": 5, "pazar": 6}
+_WEEKDAYS_EN = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+_MONTHS = {**_MONTHS_TR, **_MONTHS_EN}
+_WEEKDAYS = {**_WEEKDAYS_TR, **_WEEKDAYS_EN}
+_RELATIVE_DAYS = {"today": 0, "bugün": 0, "tomorrow": 1, "yarın": 1}
+
+
+def _alternation(tr: Dict[str, int], en: Dict[str, int]) -> str:
+    # Uzun adlar önce ("cumartesi" > "cuma", "september" > "sep"). Türkçe adlardan
+    # sonra ek gelebilir ("eylülde", "cumaya"); İngilizce kısaltmalar tam kelime olmalı.
+    tr_alt = "|".join(sorted(tr, key=len, reverse=True))
+    en_alt = "|".join(sorted(en, key=len, reverse=True))
+    return rf"{tr_alt}|(?:{en_alt})\b"
+
+
+_MONTH_ALT = _alternation(_MONTHS_TR, _MONTHS_EN)
+_WEEKDAY_ALT = _alternation(_WEEKDAYS_TR, _WEEKDAYS_EN)
+_DAY_MONTH_RE = re.compile(rf"\b(\d{{1,2}})\s+({_MONTH_ALT})")
+_MONTH_DAY_RE = re.compile(rf"\b({_MONTH_ALT})\s+(\d{{1,2}})\b")
+_MONTH_START_RE = re.compile(
+    rf"\b(?:first week of|beginning of|early)\s+({_MONTH_ALT})|\b({_MONTH_ALT})\w*\s+(?:başı|ilk hafta)"
+)
+_NEXT_WEEKDAY_RE = re.compile(rf"\b(?:next|this|önümüzdeki|gelecek|bu)\s+({_WEEKDAY_ALT})")
+_RELATIVE_RE = re.compile(r"\b(today|tomorrow|bugün|yarın)")
+
+
+def _future_date(month: int, day: int, today: dt.date) -> Optional[dt.date]:
+    """Ay/gün için bugünden itibaren ilk geçerli tarih (geçmişse gelecek yıl)."""
+    try:
+        d = dt.date(today.year, month, day)
+        return d if d >= today else d.replace(year=today.year + 1)
+    except ValueError:
+        return None
+
+
+def _fast_parse_date(text: str, today: Optional[dt.date] = None) -> Optional[dt.date]:
+    """
+    Uygulamanın tanıdığı kalıplar ("15 September", "next Friday", "first week of
+    October", "yarın"...) için regex + tablo tabanlı ayrıştırıcı. Eşleşme yoksa None.
+    """
+    today = today or dt.date.today()
+    m = _DAY_MONTH_RE.search(text)
+    if m:
+        return _future_date(_MONTHS[m.group(2)], int(m.group(1)), today)
+    m = _MONTH_DAY_RE.search(text)
+    if m:
+        return _future_date(_MONTHS[m.group(1)], int(m.group(2)), today)
+    m = _MONTH_START_RE.search(text)
+    if m:
+        return _future_date(_MONTHS[m.group(1) or m.group(2)], 1, today)
+    m = _NEXT_WEEKDAY_RE.search(text)
+    if m:
+        ahead = (_WEEKDAYS[m.group(1)] - today.weekday() - 1) % 7 + 1
+        return today + dt.timedelta(days=ahead)
+    m = _RELATIVE_RE.search(text)
+    if m:
+        return today + dt.timedelta(days=_RELATIVE_DAYS[m.group(1)])
+    return None
+
+
+_dateparser = None
+
+
+def _dp():
+    """dateparser'ı ilk ihtiyaçta yükle (import'u ~yarım saniye sürebiliyor)."""
+    global _dateparser
+    if _dateparser is None:
+        import dateparser
+        _dateparser = dateparser
+    return _dateparser
+
+
+def _parse_date(text: str) -> Optional[dt.date]:
+    d = _fast_parse_date(text)
+    if d:
+        return d
+    p = _dp().parse(text, languages=["tr", "en"])
+    return p.date() if p else None
 
 
 class ParsedIntent(BaseModel):
@@ -39,7 +143,7 @@ def parse_user_message(msg: str) -> ParsedIntent:
     adults = 1
     currency = "EUR"
 
-    cities = re.findall(r"(istanbul|sabiha|ankara|izmir|paris|londra|london|berlin|new york)", lower)
+    cities = _find_cities(lower)
     if cities:
         if len(cities) >= 2:
             origin, destination = cities[0], cities[1]
@@ -48,19 +152,17 @@ def parse_user_message(msg: str) -> ParsedIntent:
 
     date_from = None
     date_to = None
-    rng = re.search(r"(\d{1,2} [a-zçğıöşü]+).*?(\d{1,2} [a-zçğıöşü]+)", lower)
+    rng = _RANGE_RE.search(lower)
     if rng:
-        p1 = dateparser.parse(rng.group(1), languages=["tr", "en"])
-        p2 = dateparser.parse(rng.group(2), languages=["tr", "en"])
-        date_from = p1.date() if p1 else None
-        date_to = p2.date() if p2 else None
+        date_from = _parse_date(rng.group(1))
+        date_to = _parse_date(rng.group(2))
+        # Dönüş tarihi bugüne değil gidişe göre çözülür: gidiş gelecek yıla kaydıysa dönüş de kayar.
+        if date_from and date_to and date_to < date_from:
+            date_to = _future_date(date_to.month, date_to.day, date_from)
     else:
-        d = dateparser.parse(lower, languages=["tr", "en"])
-        if d:
-            date_from = d.date()
+        date_from = _parse_date(lower)
 
-    keywords = ["uç", "uçak", "flight", "bilet", "fly"]
-    if any(k in lower for k in keywords) and (destination or origin):
+    if (destination or origin) and _KW_RE.search(lower):
         return ParsedIntent(
             intent="flight_search",
             origin=origin,
@@ -73,7 +175,21 @@ def parse_user_message(msg: str) -> ParsedIntent:
 
     return ParsedIntent(intent="chitchat")
 
-_IATA_TO_CITY = {
+
+def needs_llm_summary(user_text: str) -> bool:
+    """
+    Uçuş sonuçları varken GPT özeti gerekli mi? LLM_SUMMARY_MODE'a göre karar verir;
+    "on_ambiguous" modunda kısa ve düz uçuş sorguları için False döner.
+    """
+    mode = settings.LLM_SUMMARY_MODE
+    if mode == "always":
+        return True
+    if mode == "off":
+        return False
+    lower = (user_text or "").lower()
+    return len(lower.split()) > settings.LLM_SUMMARY_MAX_WORDS or bool(_AMBIGUOUS_RE.search(lower))
+
+_IATA_TO_CITY = types.MappingProxyType({
     "LON": "London",
     "IST": "Istanbul",
     "SAW": "Istanbul (Sabiha Gökçen)",
@@ -82,7 +198,7 @@ _IATA_TO_CITY = {
     "PAR": "Paris",
     "BER": "Berlin",
     "NYC": "New York",
-}
+})
 
 _IATA_LUT = {
     "istanbul": "IST",
@@ -97,52 +213,231 @@ _IATA_LUT = {
     "new york": "NYC",
 }
 
-def to_iata(code_or_name: Optional[str], default: str) -> str:
+
+def _build_city_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for name in _IATA_LUT:
+        automaton.add_word(name, name)
+    automaton.make_automaton()
+    return automaton
+
+
+# Tüm şehir adları tek geçişte: pyahocorasick varsa Aho-Corasick, yoksa derlenmiş alternasyon.
+_CITY_AUTOMATON = _build_city_automaton()
+_CITY_RE = re.compile("|".join(re.escape(n) for n in sorted(_IATA_LUT, key=len, reverse=True)))
+
+
+def _find_cities(lower: str) -> List[str]:
+    """Metindeki şehir adları, soldan sağa ve çakışmasız (re.findall ile aynı sırada)."""
+    if _CITY_AUTOMATON is None:
+        return _CITY_RE.findall(lower)
+    # Regex gibi en soldaki, o konumda da en uzun eşleşme kazanır ("istanbul sabiha" > "istanbul").
+    matches = sorted((end - len(name) + 1, -len(name), name) for end, name in _CITY_AUTOMATON.iter(lower))
+    hits: List[str] = []
+    pos = 0
+    for start, _, name in matches:
+        if start >= pos:
+            hits.append(name)
+            pos = start + len(name)
+    return hits
+
+
+def to_iata(code_or_name: Optional[str], default: Optional[str] = None) -> Optional[str]:
     """
     Kullanıcı IATA girdiyse (3 harf) direkt kabul et; değilse LUT'tan çevir.
-    Bulunamazsa default döner.
+    Bulunamazsa default (verilmediyse None) döner.
     """
     if not code_or_name:
         return default
     val = code_or_name.strip()
     if len(val) == 3 and val.isalpha():
         return val.upper()
-    return _IATA_LUT.get(val.lower(), default)
+    lower = val.lower()
+    code = _IATA_LUT.get(lower)
+    if code:
+        return code
+    # "istanbul sabiha gökçen" gibi serbest metinlerde ilk bilinen şehir adı
+    cities = _find_cities(lower)
+    return _IATA_LUT[cities[0]] if cities else default
 
 
 class GPTAgent:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY) if (OpenAI and settings.OPENAI_API_KEY) else None
         self.model = settings.OPENAI_MODEL
+        self.cheap_model = settings.OPENAI_MODEL_CHEAP
+        self.temperature = 0.3
+        self.cache = ResponseCache(
+            embed=self.aembed if settings.OPENAI_API_KEY else None,
+            maxsize=settings.RESPONSE_CACHE_SIZE,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            path=os.path.join(settings.CACHE_DIR, "gpt_responses.npz"),
+        )
 
-    def chat(self, messages: List[dict]) -> str:
-        if not self.client:
+    @property
+    def client(self):
+        return openai_client()
+
+    def _route(self, tier: str):
+        """tier="cheap" -> küçük/ucuz model (opsiyonel OpenAI-uyumlu uç nokta), aksi halde varsayılan."""
+        if tier == "cheap" and self.cheap_model:
+            if settings.OPENAI_CHEAP_BASE_URL:
+                return openai_client(settings.OPENAI_CHEAP_BASE_URL, settings.OPENAI_CHEAP_API_KEY), self.cheap_model
+            return self.client, self.cheap_model
+        return self.client, self.model
+
+    async def aembed(self, text: str) -> List[float]:
+        async with OPENAI_LIMIT:
+            resp = await self.client.embeddings.create(model=settings.EMBEDDING_MODEL, input=text)
+        return resp.data[0].embedding
+
+    def _cache_args(self, model: str, messages: List[dict]):
+        """(exact key, context key, query): query = son kullanıcı mesajı, context = geri kalan her şey."""
+        idx = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=None)
+        query = messages[idx]["content"] if idx is not None else ""
+        rest = [m for i, m in enumerate(messages) if i != idx]
+        return (
+            cache_key(model, self.temperature, messages),
+            cache_key(model, self.temperature, rest),
+            query,
+        )
+
+    async def achat(self, messages: List[dict], tier: str = "default") -> str:
+        client, model = self._route(tier)
+        if not client:
             last = messages[-1]["content"] if messages else ""
             return f"(Local GPT mock) You said: {last}"
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.3,
-        )
-        return resp.choices[0].message.content
+        key, ctx, query = self._cache_args(model, messages)
+        hit = await self.cache.get(key, ctx, query)
+        if hit is not None:
+            return hit
+        async with OPENAI_LIMIT:
+            resp = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+            )
+        reply = resp.choices[0].message.content
+        await self.cache.put(key, ctx, query, reply)
+        return reply
+
+    async def astream(self, messages: List[dict], tier: str = "default") -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive (cache hits arrive in one piece)."""
+        client, model = self._route(tier)
+        if not client:
+            yield await self.achat(messages, tier=tier)
+            return
+        key, ctx, query = self._cache_args(model, messages)
+        hit = await self.cache.get(key, ctx, query)
+        if hit is not None:
+            yield hit
+            return
+        parts: List[str] = []
+        async with OPENAI_LIMIT:  # slot akış bitene kadar tutulur
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content or ""
+                    parts.append(delta)
+                    yield delta
+        await self.cache.put(key, ctx, query, "".join(parts))
 
 
 class ClaudeAgent:
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY) if (anthropic and settings.ANTHROPIC_API_KEY) else None
         self.model = settings.ANTHROPIC_MODEL
+        # Yalnızca birebir eşleşme: benzer metinlerde fiyat/saat farkı çeviriyi geçersiz kılar.
+        self.cache = ResponseCache(
+            maxsize=settings.RESPONSE_CACHE_SIZE,
+            path=os.path.join(settings.CACHE_DIR, "claude_translations.npz"),
+        )
+        self._batcher = AsyncBatcher(
+            self._translate_batch, flush_ms=settings.BATCH_FLUSH_MS, max_batch=settings.BATCH_MAX_SIZE
+        )
 
-    def translate(self, text: str, target_lang: str = "en") -> str:
-        prompt = f"Translate the following text into {target_lang}. Keep prices and times intact.\n\n{text}"
+    @property
+    def client(self):
+        return anthropic_client()
+
+    async def atranslate(self, text: str, target_lang: str = "en") -> str:
         if not self.client:
             return f"(Local Claude mock) [{target_lang}] {text}"
-        msg = self.client.messages.create(
-            model=self.model,
-            max_tokens=800,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        key = cache_key(self.model, target_lang, text)
+        hit = await self.cache.get(key, "", "")
+        if hit is not None:
+            return hit
+        translated = await self._batcher.submit((text, target_lang))
+        await self.cache.put(key, "", "", translated)
+        return translated
+
+    async def _translate_one(self, text: str, target_lang: str) -> str:
+        prompt = f"Translate the following text into {target_lang}. Keep prices and times intact.\n\n{text}"
+        async with ANTHROPIC_LIMIT:
+            msg = await self.client.messages.create(
+                model=self.model,
+                max_tokens=800,
+                messages=[{"role": "user", "content": prompt}],
+            )
         return msg.content[0].text
 
+    async def _translate_batch(self, items: List[Tuple[str, str]]) -> List[Union[str, Exception]]:
+        """
+        Aynı dile giden metinleri tek Claude isteğinde çevirir; istek başarısız olursa
+        ya da işaretler bozulursa tek tek çevirir. Metinler farklı oturumlardan gelebilir:
+        bir metnin hatası yalnızca onun sonucuna (Exception olarak) yansır.
+        """
+        out: Dict[int, Union[str, Exception]] = {}
+        by_lang: Dict[str, List[int]] = {}
+        for i, (_, lang) in enumerate(items):
+            by_lang.setdefault(lang, []).append(i)
+
+        async def _group(lang: str, idxs: List[int]) -> None:
+            texts = [items[i][0] for i in idxs]
+            # Metnin kendisi işaret satırı içeriyorsa yanıt ayrıştırılamaz: birleştirme.
+            if len(texts) > 1 and not any(_SEGMENT_RE.search(t) for t in texts):
+                joined = "\n".join(f"⟦{n}⟧\n{t}" for n, t in enumerate(texts))
+                prompt = (
+                    f"Translate each segment below into {lang}. Keep prices and times intact. "
+                    f"Keep every ⟦n⟧ marker line exactly as is and output nothing else.\n\n{joined}"
+                )
+                try:
+                    async with ANTHROPIC_LIMIT:
+                        msg = await self.client.messages.create(
+                            model=self.model,
+                            max_tokens=800 * len(texts),
+                            messages=[{"role": "user", "content": prompt}],
+                        )
+                except Exception as e:
+                    print(f"[claude] batched translation failed, retrying per text: {e}")
+                else:
+                    parts = _SEGMENT_RE.split(msg.content[0].text)
+                    # split -> ["", "0", seg0, "1", seg1, ...]; işaretler tam olarak 0..n-1 sırasıyla gelmeli.
+                    # Kesilmiş yanıtta son segment yarım kalır; işaretler tam olsa da güvenme.
+                    if msg.stop_reason != "max_tokens" and parts[1::2] == [str(n) for n in range(len(texts))]:
+                        for i, seg in zip(idxs, parts[2::2]):
+                            out[i] = seg.strip()
+                        return
+            results = await asyncio.gather(
+                *(self._translate_one(t, lang) for t in texts), return_exceptions=True
+            )
+            for i, res in zip(idxs, results):
+                out[i] = res
+
+        # Her istek metin başına 800 token alır; grup 4096 token'ı aşmasın diye bölünür.
+        step = max(1, 4096 // 800)
+        await asyncio.gather(*(
+            _group(lang, idxs[k:k + step])
+            for lang, idxs in by_lang.items()
+            for k in range(0, len(idxs), step)
+        ))
+        return [out[i] for i in range(len(items))]
+
 
 class Orchestrator:
     def __init__(self):
@@ -156,73 +451,120 @@ class Orchestrator:
             client_id=settings.AMADEUS_API_KEY,
             client_secret=settings.AMADEUS_API_SECRET,
             env=getattr(settings, "AMADEUS_ENV", "test"),
+            token_path=os.path.join(settings.CACHE_DIR, "amadeus.json"),
+            cache_ttl=settings.AMADEUS_CACHE_TTL,
         )
         self._iata_direct = True  
         
-    def handle(self, user_text: str, want_translation: bool = False, target_lang: str = "en"):
+    async def handle(self, user_text: str, want_translation: bool = False, target_lang: str = "en"):
         """
-        Dönüş:
+        Async generator; GPT akarken kısmi sonuçlar, en sonda tam sonuç yield eder:
             base_reply (str),
             translated (Optional[str]),
             tool_results (List[Dict]),
-            dest_label (Optional[str])  # Görsel üretimi için
+            image_path (Optional[str])  # Uçuş bulunduysa hedef şehir görseli
+        Uçuş listesi Amadeus'tan hemen sonra, GPT metni ve görsel hazır oldukça yield edilir.
         """
         intent = parse_user_message(user_text)
 
         tool_results: List[Dict] = []
         tool_note = None
         dest_label: Optional[str] = None
-
-        if intent.intent == "flight_search":
-            orig_code = to_iata(intent.origin, "IST")
-            dest_code = to_iata(intent.destination, "LON")
-
-            dest_label = intent.destination or _IATA_TO_CITY.get(dest_code, dest_code)
-
-            if not dest_code:
-                tool_note = "Could not resolve destination. Please specify a city/airport (IATA code)."
-            else:
-                date_from = intent.date_from or dt.date.today() + dt.timedelta(days=7)
-                date_to = intent.date_to or date_from
-                try:
-                    tool_results = self.flights.search(
-                        origin=orig_code,
-                        destination=dest_code,
-                        date_from=date_from,
-                        date_to=date_to,
-                        adults=intent.adults,
-                        currency=intent.currency,
-                    )
-                except Exception as e:
-                    tool_note = f"Flight search failed: {e}"
-
-        sys_prompt = (
-            "You are a travel planning assistant. If the user asked for flights, summarize options briefly. "
-            "Include links if available."
-        )
-        messages = [
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": user_text},
-        ]
-
-        if tool_results:
-            bullets = "\n".join(
-                [
-                    f"- {r.get('date')} {r.get('departure_time')} {r.get('origin')} → {r.get('destination')} — {r.get('airline')} — {r.get('price')}"
-                    for r in tool_results[:5]
-                ]
+        img_task: Optional[asyncio.Task] = None
+        trans_task: Optional[asyncio.Task] = None
+
+        try:
+            if intent.intent == "flight_search":
+                orig_code = to_iata(intent.origin, "IST")
+                dest_code = to_iata(intent.destination)
+
+                if not dest_code:
+                    tool_note = "Could not resolve destination. Please specify a city/airport (IATA code)."
+                else:
+                    # Kullanıcıya kanonik ad gösterilir ("london"/"londra" -> "London").
+                    dest_label = _IATA_TO_CITY.get(dest_code, dest_code)
+                    # Görsel yalnızca hedefe bağlı: uçuş aramasıyla paralel, spekülatif başlat.
+                    img_task = asyncio.create_task(generate_city_image_1024_async(intent.destination or dest_label))
+
+                    date_from = intent.date_from or dt.date.today() + dt.timedelta(days=7)
+                    date_to = intent.date_to or date_from
+                    try:
+                        tool_results = await self.flights.asearch(
+                            origin=orig_code,
+                            destination=dest_code,
+                            date_from=date_from,
+                            date_to=date_to,
+                            adults=intent.adults,
+                            currency=intent.currency,
+                        )
+                    except Exception as e:
+                        tool_note = f"Flight search failed: {e}"
+
+                if not tool_results and img_task:
+                    img_task.cancel()
+                    img_task = None
+
+            sys_prompt = (
+                "You are a travel planning assistant. If the user asked for flights, summarize options briefly. "
+                "Include links if available."
             )
-            messages.append({"role": "system", "content": f"Flight summaries:\n{bullets}"})
-
-        base_reply = self.gpt.chat(messages)
-
-        if tool_results and "Flight summaries" not in base_reply:
-            base_reply += "\n\n(See the options listed above.)"
-        if tool_note:
-            base_reply += f"\n\nNote: {tool_note}"
-
-        translated = None
-        if want_translation:
-            translated = self.claude.translate(base_reply, target_lang=target_lang)
-
-        return base_reply, translated, tool_results, dest_label
+            messages = [
+                {"role": "system", "content": sys_prompt},
+                {"role": "user", "content": user_text},
+            ]
+
+            bullets = ""
+            if tool_results:
+                bullets = "\n".join(
+                    [
+                        f"- {r.get('date')} {r.get('departure_time')} {r.get('origin')} → {r.get('destination')} — {r.get('airline')} — {r.get('price')}"
+                        for r in tool_results[:5]
+                    ]
+                )
+                messages.append({"role": "system", "content": (
+                    f"Flight summaries:\n{bullets}\n\n"
+                    "These options are already shown to the user above your reply; "
+                    "add a brief wrap-up instead of repeating the list."
+                )})
+
+            # Liste Amadeus verisinden hazır: GPT'yi beklemeden hemen göster.
+            listing = f"Here are options to {dest_label}:\n{bullets}" if tool_results else ""
+            if listing:
+                yield listing, None, tool_results, None
+
+            if tool_results and not needs_llm_summary(user_text):
+                # Deterministik liste: GPT turu atlanır.
+                base_reply = listing
+            else:
+                base_reply = f"{listing}\n\n" if listing else ""
+                # Sohbet için küçük model yeterli; uçuş özetleri varsayılan modelde kalır.
+                tier = "cheap" if intent.intent == "chitchat" else "default"
+                async for delta in self.gpt.astream(messages, tier=tier):
+                    if not delta:
+                        continue
+                    base_reply += delta
+                    yield base_reply, None, tool_results, None
+            if tool_note:
+                base_reply += f"\n\nNote: {tool_note}"
+
+            # Çeviri ve (zaten başlamış) görsel birbirinden bağımsız: hangisi önce biterse onu göster.
+            if want_translation:
+                trans_task = asyncio.create_task(self.claude.atranslate(base_reply, target_lang=target_lang))
+            translated = None
+            image_path = None
+            pending = {t for t in (trans_task, img_task) if t}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if trans_task in done:
+                    translated = trans_task.result()
+                if img_task in done:
+                    image_path = img_task.result()
+                if pending:
+                    yield base_reply, translated, tool_results, image_path
+
+            yield base_reply, translated, tool_results, image_path
+        finally:
+            # Akış yarıda kesilirse (hata/iptal) arka plan işlerini boşa sürdürme.
+            for task in (img_task, trans_task):
+                if task and not task.done():
+                    task.cancel()
@@ -1,23 +1,18 @@
 from __future__ import annotations
 import os
-import re
-import base64
+import asyncio
+import tempfile
+import threading
+import time
 import traceback
-import requests
 import gradio as gr
-import pandas as pd
 
 from config import settings
 from agents import Orchestrator
-
-# OpenAI client (Images + STT + TTS)
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
+from tools.http import openai_client
+from tools.limits import OPENAI_LIMIT
 
 orch = Orchestrator()
-oa_client = OpenAI(api_key=settings.OPENAI_API_KEY) if (OpenAI and settings.OPENAI_API_KEY) else None
 
 # ---------- Constants ----------
 LANG_CHOICES = [
@@ -27,111 +22,128 @@ LANG_CHOICES = [
     ("Spanish", "es"),
     ("Italian", "it"),
 ]
-IMG_DIR = os.path.join(os.getcwd(), "generated_images")
+# Amadeus sonuç sözlüklerinin sütun sırası (tools/amadeus.py)
+FLIGHT_COLUMNS = ["date", "departure_time", "arrival_time", "origin", "destination", "airline", "price", "link"]
 AUDIO_DIR = os.path.join(os.getcwd(), "generated_audio")
-os.makedirs(IMG_DIR, exist_ok=True)
 os.makedirs(AUDIO_DIR, exist_ok=True)
+_AUDIO_TTL_SECONDS = 3600
 
 # ---------- Utils ----------
-def _safe_name(s: str) -> str:
-    return re.sub(r"[^a-zA-Z0-9_.-]+", "_", (s or "")).strip("_") or "city"
-
-def generate_city_image_1024(city_hint: str) -> str | None:
-    """Generate a 1024x1024 city image via DALL·E 3 (b64 or URL response)."""
-    if not (oa_client and settings.OPENAI_API_KEY):
-        print("[image] OpenAI client yok ya da API key eksik.")
-        return None
-
-    model_name = getattr(settings, "IMAGE_MODEL", "dall-e-3")
-    prompt = (
-        f"A high-quality 1024x1024 photorealistic wide cityscape of {city_hint}, "
-        f"with iconic landmarks and golden-hour lighting."
-    )
-    print(f"[image] trying model: {model_name}")
-
-    try:
-        resp = oa_client.images.generate(
-            model=model_name,
-            prompt=prompt,
-            size="1024x1024",
-            n=1,
-            response_format="b64_json",
-        )
-
-        b64 = getattr(resp.data[0], "b64_json", None)
-        if b64:
-            raw = base64.b64decode(b64)
-            fname = f"city_{_safe_name(city_hint)}.png"
-            fpath = os.path.join(IMG_DIR, fname)
-            with open(fpath, "wb") as f:
-                f.write(raw)
-            print(f"[image] generated (b64) with {model_name}: {fpath}")
-            return fpath
-
-        url = getattr(resp.data[0], "url", None)
-        if url:
-            r = requests.get(url, timeout=30)
-            r.raise_for_status()
-            fname = f"city_{_safe_name(city_hint)}.png"
-            fpath = os.path.join(IMG_DIR, fname)
-            with open(fpath, "wb") as f:
-                f.write(r.content)
-            print(f"[image] generated (url) with {model_name}: {fpath}")
-            return fpath
-
-        print(f"[image] no b64/url in response: {resp}")
-        return None
-
-    except Exception as e:
-        print(f"[image] {model_name} failed: {e}")
-        traceback.print_exc()
-        return None
-
-def transcribe_audio_to_text(audio_path: str) -> str:
-    """Mic → transcript (no translate, no auto-send)."""
-    if not (oa_client and settings.OPENAI_API_KEY):
+_asr = None
+_asr_retry_at = 0.0  # monotonic; inf = kalıcı olarak yok (paket kurulu değil)
+_asr_lock = threading.Lock()
+_ASR_RETRY_SECONDS = 300
+
+
+def _local_asr():
+    """faster-whisper modelini ilk kullanımda yükle (GPU varsa fp16, yoksa CPU int8); olmazsa None."""
+    global _asr, _asr_retry_at
+    if _asr is not None or time.monotonic() < _asr_retry_at or not settings.LOCAL_ASR_MODEL:
+        return _asr
+    with _asr_lock:
+        if _asr is None and time.monotonic() >= _asr_retry_at:
+            try:
+                import ctranslate2
+                from faster_whisper import WhisperModel
+            except ImportError as e:
+                _asr_retry_at = float("inf")
+                print(f"[voice] local ASR not installed, using Whisper API: {e}")
+                return None
+            try:
+                if ctranslate2.get_cuda_device_count() > 0:
+                    device, compute_type = "cuda", "float16"
+                else:
+                    device, compute_type = "cpu", "int8"
+                _asr = WhisperModel(settings.LOCAL_ASR_MODEL, device=device, compute_type=compute_type, num_workers=2)
+                print(f"[voice] local ASR ready: {settings.LOCAL_ASR_MODEL} on {device}/{compute_type}")
+            except Exception as e:
+                # Model indirme/GPU hatası geçici olabilir: bir süre API'ye düş, sonra yeniden dene.
+                _asr_retry_at = time.monotonic() + _ASR_RETRY_SECONDS
+                print(f"[voice] local ASR unavailable, using Whisper API for {_ASR_RETRY_SECONDS}s: {e}")
+    return _asr
+
+
+def _transcribe_local(model, audio_path: str) -> str:
+    segments, _ = model.transcribe(audio_path, vad_filter=True)
+    return " ".join(s.text.strip() for s in segments)
+
+
+async def transcribe_audio_to_text(audio_path: str) -> str:
+    """Mic → transcript (no translate, no auto-send). Local faster-whisper first, Whisper API as fallback."""
+    model = await asyncio.to_thread(_local_asr)
+    if model is not None:
+        try:
+            return await asyncio.to_thread(_transcribe_local, model, audio_path)
+        except Exception as e:
+            print(f"[voice] local transcription failed, falling back to API: {e}")
+            traceback.print_exc()
+
+    oa_client = openai_client()  # STT
+    if not oa_client:
         return ""
     try:
         with open(audio_path, "rb") as f:
-            tr = oa_client.audio.transcriptions.create(model="whisper-1", file=f)
+            async with OPENAI_LIMIT:
+                tr = await oa_client.audio.transcriptions.create(model="whisper-1", file=f)
         return tr.text or ""
     except Exception as e:
         print(f"[voice] transcription failed: {e}")
         traceback.print_exc()
         return ""
 
-def tts_from_text(text: str) -> str | None:
+def _prune_audio() -> None:
+    """Gradio çıktıyı kendi önbelleğine kopyalar; _AUDIO_TTL_SECONDS'tan eski TTS dosyalarını sil."""
+    cutoff = time.time() - _AUDIO_TTL_SECONDS
+    try:
+        entries = list(os.scandir(AUDIO_DIR))
+    except OSError:
+        return
+    for e in entries:
+        if not (e.name.startswith("my_message_") and e.name.endswith(".mp3")):
+            continue
+        try:
+            if e.stat().st_mtime < cutoff:
+                os.remove(e.path)
+        except OSError:
+            pass
+
+
+async def tts_from_text(text: str) -> str | None:
     """User's typed message → TTS mp3 (on demand)."""
-    if not (oa_client and settings.OPENAI_API_KEY) or not text.strip():
+    oa_client = openai_client()  # TTS
+    if not oa_client or not text.strip():
         return None
     model = getattr(settings, "TTS_MODEL", "gpt-4o-mini-tts")
     voice = getattr(settings, "TTS_VOICE", "alloy")
-    out_path = os.path.join(AUDIO_DIR, "my_message.mp3")
+    # İstek başına ayrı dosya: eşzamanlı kullanıcılar birbirinin sesini ezmesin.
+    _prune_audio()
+    with tempfile.NamedTemporaryFile(dir=AUDIO_DIR, prefix="my_message_", suffix=".mp3", delete=False) as f:
+        out_path = f.name
     try:
-        with oa_client.audio.speech.with_streaming_response.create(
+        async with OPENAI_LIMIT, oa_client.audio.speech.with_streaming_response.create(
             model=model,
             voice=voice,
             input=text,
         ) as response:
-            response.stream_to_file(out_path)
+            await response.stream_to_file(out_path)
         return out_path
     except Exception as e:
         print(f"[voice] tts failed: {e}")
         traceback.print_exc()
+        os.remove(out_path)
         return None
 
 # ---------- Core Chat ----------
-def chat_core(message, history, do_translate, lang_code):
-    # agents.handle -> (reply, translated, flights, dest_label)
-    reply, translated, flights, dest_label = orch.handle(
+async def chat_core(message, history, do_translate, lang_code):
+    # agents.handle -> (reply, translated, flights, image_path), streamed
+    df = None
+    async for reply, translated, flights, image_path in orch.handle(
         message, want_translation=do_translate, target_lang=lang_code
-    )
-    df = pd.DataFrame(flights) if flights else None
-    image_path = None
-    if flights and dest_label:
-        image_path = generate_city_image_1024(dest_label)
-
-    return reply, df, (translated or ""), image_path
+    ):
+        if df is None and flights:
+            # gr.Dataframe düz liste kabul eder; birkaç satır için pandas'a gerek yok.
+            df = {"headers": FLIGHT_COLUMNS, "data": [[r.get(h, "") for h in FLIGHT_COLUMNS] for r in flights]}
+        yield reply, df, (translated or ""), image_path
 
 # ---------- UI ----------
 with gr.Blocks(title="FlightChat Agents – Text + STT + Optional TTS") as demo:
@@ -171,8 +183,8 @@ with gr.Blocks(title="FlightChat Agents – Text + STT + Optional TTS") as demo:
         mic_audio = gr.Audio(sources=["microphone"], type="filepath", label="Record your voice")
         transcript_box = gr.Textbox(label="Transcript (preview)", interactive=False)
     with gr.Row():
-        def do_transcribe(audio_file):
-            txt = transcribe_audio_to_text(audio_file) if audio_file else ""
+        async def do_transcribe(audio_file):
+            txt = await transcribe_audio_to_text(audio_file) if audio_file else ""
             # 1) transcript preview, 2) set chat textbox value
             return gr.update(value=txt), gr.update(value=txt)
 
@@ -184,11 +196,13 @@ with gr.Blocks(title="FlightChat Agents – Text + STT + Optional TTS") as demo:
     gr.Markdown("### 🔊 Read my message (optional)")
     tts_audio_out = gr.Audio(label="Playback", type="filepath")
 
-    def read_my_message(msg_text):
-        path = tts_from_text(msg_text or "")
+    async def read_my_message(msg_text):
+        path = await tts_from_text(msg_text or "")
         return gr.update(value=path)
 
     gr.Button("Read my message").click(read_my_message, [chat.textbox], [tts_audio_out])
 
 if __name__ == "__main__":
+    # Handler'lar async: event loop'u bloklamadan birden çok oturum paralel işlenir.
+    demo.queue(default_concurrency_limit=settings.GRADIO_CONCURRENCY)
     demo.launch(share=settings.GRADIO_SHARE)
@@ -6,16 +6,48 @@ load_dotenv()
 class Settings:
     OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    # Chit-chat tier: smaller model, optionally on an OpenAI-compatible endpoint (e.g. local llama)
+    OPENAI_MODEL_CHEAP: str = os.getenv("OPENAI_MODEL_CHEAP", "gpt-4.1-nano")
+    OPENAI_CHEAP_BASE_URL: str | None = os.getenv("OPENAI_CHEAP_BASE_URL") or None
+    OPENAI_CHEAP_API_KEY: str | None = os.getenv("OPENAI_CHEAP_API_KEY") or None
+    # Flight results summary via GPT: "off" | "always" | "on_ambiguous"
+    LLM_SUMMARY_MODE: str = os.getenv("LLM_SUMMARY_MODE", "on_ambiguous").lower()
+    LLM_SUMMARY_MAX_WORDS: int = int(os.getenv("LLM_SUMMARY_MAX_WORDS", "16"))
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    OPENAI_RPM: float = float(os.getenv("OPENAI_RPM", "500"))
 
     ANTHROPIC_API_KEY: str | None = os.getenv("ANTHROPIC_API_KEY")
     ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
+    ANTHROPIC_MAX_CONCURRENCY: int = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "4"))
+    ANTHROPIC_RPM: float = float(os.getenv("ANTHROPIC_RPM", "50"))
+    # Per-request timeout for the OpenAI/Anthropic SDKs (seconds)
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "600"))
 
     AMADEUS_API_KEY = os.getenv("AMADEUS_API_KEY")
     AMADEUS_API_SECRET = os.getenv("AMADEUS_API_SECRET")
     AMADEUS_ENV = os.getenv("AMADEUS_ENV", "test")
+    AMADEUS_CACHE_TTL: int = int(os.getenv("AMADEUS_CACHE_TTL", "300"))
+    AMADEUS_MAX_CONCURRENCY: int = int(os.getenv("AMADEUS_MAX_CONCURRENCY", "10"))
+    AMADEUS_RPS: float = float(os.getenv("AMADEUS_RPS", "10"))
+
+    CACHE_DIR: str = os.getenv("FLIGHTCHAT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "flightchat"))
 
     GRADIO_SHARE: bool = os.getenv("GRADIO_SHARE", "false").lower() == "true"
+    GRADIO_CONCURRENCY: int = int(os.getenv("GRADIO_CONCURRENCY", "8"))
+
+    # Local faster-whisper model for voice input ("" = always use the Whisper API)
+    LOCAL_ASR_MODEL: str = os.getenv("LOCAL_ASR_MODEL", "small")
 
     IMAGE_MODEL: str = os.getenv("IMAGE_MODEL", "dall-e-3")
+    IMAGE_CONCURRENCY: int = int(os.getenv("IMAGE_CONCURRENCY", "4"))
+    MAX_IMAGE_BYTES: int = int(os.getenv("MAX_IMAGE_BYTES", str(8 * 1024 * 1024)))
+    IMAGE_CACHE_MAX_MB: int = int(os.getenv("IMAGE_CACHE_MAX_MB", "200"))
+
+    # Micro-batching window for translation requests
+    BATCH_FLUSH_MS: int = int(os.getenv("BATCH_FLUSH_MS", "25"))
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "16"))
 
 settings = Settings()
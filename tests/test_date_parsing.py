@@ -0,0 +1,56 @@
+import datetime as dt
+import functools
+
+import pytest
+
+import agents
+
+THURSDAY = dt.date(2026, 10, 15)
+FRIDAY = dt.date(2026, 10, 16)
+
+
+@pytest.mark.parametrize("text, today, expected", [
+    ("15 september", dt.date(2026, 9, 1), dt.date(2026, 9, 15)),
+    ("15 september", THURSDAY, dt.date(2027, 9, 15)),  # bu yılki geçti -> gelecek yıl
+    ("next friday", THURSDAY, FRIDAY),
+    ("next friday", FRIDAY, dt.date(2026, 10, 23)),  # bugün cuma -> bir sonraki cuma
+    ("önümüzdeki cuma", THURSDAY, FRIDAY),
+    ("ekim başı", dt.date(2026, 9, 1), dt.date(2026, 10, 1)),
+    ("ekim başı", THURSDAY, dt.date(2027, 10, 1)),
+    ("3 ekimde", dt.date(2026, 9, 1), dt.date(2026, 10, 3)),
+    ("yarın", THURSDAY, FRIDAY),
+])
+def test_fast_parse_date(text, today, expected):
+    assert agents._fast_parse_date(text, today=today) == expected
+
+
+def test_english_abbreviation_needs_word_boundary():
+    assert agents._fast_parse_date("3 decisions", today=THURSDAY) is None
+
+
+def test_invalid_day_falls_through_to_dateparser(monkeypatch):
+    assert agents._fast_parse_date("31 february", today=THURSDAY) is None
+
+    calls = []
+
+    class _FakeDateparser:
+        @staticmethod
+        def parse(text, languages=None):
+            calls.append(text)
+            return None
+
+    monkeypatch.setattr(agents, "_dp", lambda: _FakeDateparser)
+    assert agents._parse_date("31 february") is None
+    assert calls == ["31 february"]
+
+
+@pytest.mark.parametrize("today, expected", [
+    (THURSDAY, (dt.date(2026, 12, 28), dt.date(2027, 1, 3))),
+    # Gidiş gelecek yıla kaydığında dönüş de ondan sonra olmalı.
+    (dt.date(2026, 12, 30), (dt.date(2027, 12, 28), dt.date(2028, 1, 3))),
+])
+def test_december_to_january_range(monkeypatch, today, expected):
+    monkeypatch.setattr(agents, "_fast_parse_date", functools.partial(agents._fast_parse_date, today=today))
+    intent = agents.parse_user_message("istanbul londra uçuş 28 aralık - 3 ocak")
+    assert intent.intent == "flight_search"
+    assert (intent.date_from, intent.date_to) == expected
@@ -0,0 +1,34 @@
+import re
+
+import pytest
+
+import agents
+
+
+@pytest.fixture
+def overlapping_aliases(monkeypatch):
+    # Bir takma ad diğerinin öneki olduğunda iki yol da aynı sonucu vermeli.
+    monkeypatch.setitem(agents._IATA_LUT, "istanbul sabiha", "SAW")
+    monkeypatch.setattr(agents, "_CITY_RE", re.compile(
+        "|".join(re.escape(n) for n in sorted(agents._IATA_LUT, key=len, reverse=True))
+    ))
+    return agents._build_city_automaton()
+
+
+@pytest.mark.parametrize("text", [
+    "istanbul sabiha to london flight",
+    "istanbul to londra",
+    "paris, new york, berlin",
+    "flights from istanbulsabiha",
+])
+def test_automaton_matches_regex(monkeypatch, overlapping_aliases, text):
+    if overlapping_aliases is None:
+        pytest.skip("pyahocorasick not installed")
+    monkeypatch.setattr(agents, "_CITY_AUTOMATON", None)
+    expected = agents._find_cities(text)
+    monkeypatch.setattr(agents, "_CITY_AUTOMATON", overlapping_aliases)
+    assert agents._find_cities(text) == expected
+
+
+def test_longest_alias_wins(overlapping_aliases):
+    assert agents._find_cities("istanbul sabiha to london flight") == ["istanbul sabiha", "london"]
@@ -1,35 +1,103 @@
 from __future__ import annotations
-import time, requests, datetime as dt
-from typing import Any, Dict, List, Optional
+import os, json, time, asyncio, datetime as dt
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from cachetools import TTLCache
+
+from tools.http import HTTP
+from tools.limits import AMADEUS_LIMIT
+
+_RETRY_STATUS = {429, 502, 503, 504}
+_RETRIES = 3
+_BACKOFF = 0.3
 
 class AmadeusFlightTool:
-    def __init__(self, client_id: str, client_secret: str, env: str = "test"):
+    def __init__(self, client_id: str, client_secret: str, env: str = "test",
+                 token_path: Optional[str] = None, cache_ttl: int = 300, cache_size: int = 512):
         self.client_id = client_id
         self.client_secret = client_secret
         self.base = "https://test.api.amadeus.com" if env != "prod" else "https://api.amadeus.com"
         self._token = None
         self._exp = 0
+        self._token_path = token_path
+        self._results: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._load_token()
 
-    def _auth(self) -> str:
-        if self._token and time.time() < self._exp - 60:
-            return self._token
-        url = f"{self.base}/v1/security/oauth2/token"
-        r = requests.post(url, data={
+    def _load_token(self) -> None:
+        """Restore a still-valid bearer token persisted by a previous process."""
+        if not self._token_path:
+            return
+        try:
+            with open(self._token_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("client_id") == self.client_id and data.get("base") == self.base:
+            self._token = data.get("token")
+            self._exp = float(data.get("exp", 0))
+
+    def _save_token(self) -> None:
+        if not self._token_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._token_path), exist_ok=True)
+            tmp = f"{self._token_path}.tmp"
+            # Bearer token düz metin: dosya yalnızca sahibi tarafından okunabilsin.
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"client_id": self.client_id, "base": self.base,
+                           "token": self._token, "exp": self._exp}, f)
+            os.replace(tmp, self._token_path)
+        except OSError as e:
+            print(f"[amadeus] could not persist token: {e}")
+
+    def _token_valid(self) -> bool:
+        return bool(self._token) and time.time() < self._exp - 60
+
+    def _auth_payload(self) -> Dict[str, str]:
+        return {
             "grant_type": "client_credentials",
             "client_id": self.client_id,
             "client_secret": self.client_secret
-        }, timeout=20)
-        r.raise_for_status()
-        data = r.json()
+        }
+
+    def _store_token(self, data: Dict[str, Any]) -> str:
         self._token = data["access_token"]
         self._exp = time.time() + int(data.get("expires_in", 1800))
+        self._save_token()
         return self._token
 
-    def search(self, origin: str, destination: str,
-               date_from: dt.date, date_to: Optional[dt.date] = None,
-               adults: int = 1, currency: str = "EUR", max_results: int = 10):
-        """Uses Flight Offers Search (GET) for a simple one-way or date-range query."""
-        token = self._auth()
+    @staticmethod
+    async def _request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send through AMADEUS_LIMIT, retrying 429/5xx gateway errors with exponential backoff."""
+        for attempt in range(_RETRIES + 1):
+            async with AMADEUS_LIMIT:
+                r = await HTTP.request(method, url, **kwargs)
+            if r.status_code not in _RETRY_STATUS or attempt == _RETRIES:
+                return r
+            delay = _BACKOFF * 2 ** attempt
+            retry_after = r.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            # Bekleme limitin dışında: diğer istekler bu sırada slotu kullanabilir.
+            await asyncio.sleep(delay)
+        return r
+
+    async def _aauth(self) -> str:
+        if self._token_valid():
+            return self._token
+        url = f"{self.base}/v1/security/oauth2/token"
+        r = await self._request("POST", url, data=self._auth_payload(), timeout=20)
+        r.raise_for_status()
+        return self._store_token(r.json())
+
+    @staticmethod
+    def _build_params(origin: str, destination: str,
+                      date_from: dt.date, date_to: Optional[dt.date],
+                      adults: int, currency: str, max_results: int) -> Dict[str, Any]:
         params = {
             "originLocationCode": origin,
             "destinationLocationCode": destination,
@@ -41,12 +109,45 @@ class AmadeusFlightTool:
 
         if date_to and date_to != date_from:
             params["returnDate"] = date_to.isoformat()
+        return params
+
+    def _cached(self, key: Tuple, force_refresh: bool) -> Optional[List[Dict[str, Any]]]:
+        if force_refresh:
+            self._results.pop(key, None)
+            return None
+        hit = self._results.get(key)
+        return [dict(r) for r in hit] if hit is not None else None
+
+    def _remember(self, key: Tuple, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self._results[key] = [dict(r) for r in results]
+        return results
+
+    async def asearch(self, origin: str, destination: str,
+                      date_from: dt.date, date_to: Optional[dt.date] = None,
+                      adults: int = 1, currency: str = "EUR", max_results: int = 10,
+                      force_refresh: bool = False):
+        """Uses Flight Offers Search (GET) for a simple one-way or date-range query.
+
+        Token and offers requests go over the shared HTTP/2 client. Identical
+        queries are served from a short-lived in-process cache; pass
+        `force_refresh=True` to bypass it.
+        """
+        params = self._build_params(origin, destination, date_from, date_to, adults, currency, max_results)
+        key = tuple(sorted(params.items()))
+        hit = self._cached(key, force_refresh)
+        if hit is not None:
+            return hit
+        return self._remember(key, await self._asearch_uncached(params, currency))
 
+    async def _asearch_uncached(self, params: Dict[str, Any], currency: str) -> List[Dict[str, Any]]:
         url = f"{self.base}/v2/shopping/flight-offers"
-        r = requests.get(url, headers={"Authorization": f"Bearer {token}"}, params=params, timeout=30)
+        token = await self._aauth()
+        r = await self._request("GET", url, headers={"Authorization": f"Bearer {token}"}, params=params, timeout=30)
         r.raise_for_status()
-        data = r.json()
+        return self._parse_offers(r.json(), currency)
 
+    @staticmethod
+    def _parse_offers(data: Dict[str, Any], currency: str) -> List[Dict[str, Any]]:
         results = []
         for offer in data.get("data", []):
             itineraries = offer.get("itineraries", [])
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class AsyncBatcher(Generic[T, R]):
+    """
+    Micro-batching queue: `submit` calls made within `flush_ms` of each other
+    (up to `max_batch`) are handed to `handler` as one list. The handler must
+    return one result per input, in order; an Exception instance in place of a
+    result fails only that item's caller.
+    """
+
+    def __init__(self, handler: Callable[[List[T]], Awaitable[List[R]]],
+                 flush_ms: int = 25, max_batch: int = 16):
+        self.handler = handler
+        self.flush = flush_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[T, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.flush
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Handler ayrı task'ta: yavaş bir batch sonraki toplamayı bekletmesin.
+            task = asyncio.create_task(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        live = [(item, fut) for item, fut in batch if not fut.done()]
+        if not live:
+            return
+        try:
+            results = await self.handler([item for item, _ in live])
+        except Exception as e:
+            for _, fut in live:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), res in zip(live, results):
+            if fut.done():
+                continue
+            if isinstance(res, Exception):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
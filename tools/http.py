@@ -0,0 +1,68 @@
+from __future__ import annotations
+import atexit
+import asyncio
+import functools
+
+import httpx
+
+from config import settings
+
+# Tüm dış API trafiği (OpenAI, Anthropic, Amadeus, görsel indirme) tek bir
+# HTTP/2 bağlantı havuzunu paylaşır: el sıkışma bir kez, istekler çoklanır.
+HTTP = httpx.AsyncClient(
+    timeout=30,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,  # yalnızca bağlantı kurma hataları
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    ),
+)
+
+
+def _close() -> None:
+    if HTTP.is_closed:
+        return
+    try:
+        asyncio.run(HTTP.aclose())
+    except Exception:
+        pass
+
+
+atexit.register(_close)
+
+
+# SDK'lar ağır: yalnızca anahtar tanımlıysa ve ilk kullanımda import edilir.
+# Paylaşılan istemcinin 30 sn'lik timeout'u uzun üretimleri kesmesin diye SDK'lara açık timeout verilir.
+@functools.lru_cache(maxsize=None)
+def openai_client(base_url: str | None = None, api_key: str | None = None):
+    """
+    Shared AsyncOpenAI client, or None without an API key / SDK.
+
+    With a custom `base_url` (OpenAI-compatible server) only `api_key` is sent,
+    never OPENAI_API_KEY; servers that need no key get a placeholder.
+    """
+    if base_url:
+        api_key = api_key or "EMPTY"  # SDK boş anahtarda ortamdaki OPENAI_API_KEY'e düşer
+    else:
+        api_key = settings.OPENAI_API_KEY
+        if not api_key:
+            return None
+    try:
+        from openai import AsyncOpenAI
+    except Exception:
+        return None
+    return AsyncOpenAI(api_key=api_key, base_url=base_url,
+                       http_client=HTTP, timeout=settings.LLM_TIMEOUT)
+
+
+@functools.lru_cache(maxsize=None)
+def anthropic_client():
+    """Shared AsyncAnthropic client, or None without an API key / SDK."""
+    if not settings.ANTHROPIC_API_KEY:
+        return None
+    try:
+        import anthropic
+    except Exception:
+        return None
+    return anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY,
+                                    http_client=HTTP, timeout=settings.LLM_TIMEOUT)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import os
+import re
+import base64
+import asyncio
+import hashlib
+import tempfile
+import traceback
+from typing import Dict
+
+from config import settings
+from tools.http import HTTP, openai_client
+from tools.limits import OPENAI_LIMIT
+
+IMG_DIR = os.path.join(os.getcwd(), "generated_images")
+os.makedirs(IMG_DIR, exist_ok=True)
+_CHUNK = 64 * 1024
+
+
+def _safe_name(s: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.-]+", "_", (s or "")).strip("_") or "city"
+
+
+async def _download_to(url: str, fpath: str) -> None:
+    """Stream `url` into `fpath` chunk by chunk; reject bodies over MAX_IMAGE_BYTES."""
+    limit = settings.MAX_IMAGE_BYTES
+    # Eşzamanlı yazarlar aynı geçici dosyayı paylaşmasın; hata/iptal sonrası .part kalmasın.
+    fd, tmp = tempfile.mkstemp(dir=IMG_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async with HTTP.stream("GET", url, timeout=30) as r:
+                r.raise_for_status()
+                declared = int(r.headers.get("Content-Length") or 0)
+                if declared > limit:
+                    raise ValueError(f"image too large: {declared} bytes")
+                written = 0
+                async for chunk in r.aiter_bytes(_CHUNK):
+                    written += len(chunk)
+                    if written > limit:
+                        raise ValueError(f"image too large: >{limit} bytes")
+                    f.write(chunk)
+        os.replace(tmp, fpath)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_b64(b64: str, fpath: str) -> None:
+    """Decode base64 in slices so only one chunk of raw bytes is alive at a time."""
+    step = _CHUNK // 3 * 4  # 4'ün katı: her dilim bağımsız çözülebilir
+    fd, tmp = tempfile.mkstemp(dir=IMG_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for i in range(0, len(b64), step):
+                f.write(base64.b64decode(b64[i:i + step]))
+        os.replace(tmp, fpath)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _evict_old_images(keep: str) -> None:
+    """IMAGE_CACHE_MAX_MB aşılırsa en uzun süredir kullanılmayan görselleri sil (0 = sınırsız)."""
+    limit = settings.IMAGE_CACHE_MAX_MB * 1024 * 1024
+    if limit <= 0:
+        return
+    try:
+        files = [e for e in os.scandir(IMG_DIR) if e.is_file() and e.name.endswith(".png")]
+    except OSError:
+        return
+    total = sum(e.stat().st_size for e in files)
+    for e in sorted(files, key=lambda e: e.stat().st_mtime):
+        if total <= limit:
+            break
+        if e.path == keep:
+            continue
+        try:
+            size = e.stat().st_size
+            os.remove(e.path)
+            total -= size
+        except OSError:
+            pass
+
+
+async def generate_city_image_1024_async(city_hint: str) -> str | None:
+    """Generate a 1024x1024 city image via DALL·E 3 (b64 or URL response).
+
+    Callers asking for the same image while it is being generated share that
+    one generation; it is cancelled only once every caller has been cancelled.
+    At most IMAGE_CONCURRENCY generations run at a time.
+    """
+    model_name = getattr(settings, "IMAGE_MODEL", "dall-e-3")
+    prompt = (
+        f"A high-quality 1024x1024 photorealistic wide cityscape of {city_hint}, "
+        f"with iconic landmarks and golden-hour lighting."
+    )
+    # Prompt deterministik: dosya adı içerikten türetilir, aynı istek diskten döner.
+    key = hashlib.sha1(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+    fpath = os.path.join(IMG_DIR, f"city_{_safe_name(city_hint)}_{key}.png")
+    if os.path.exists(fpath):
+        os.utime(fpath)  # LRU tahliyesi için son kullanım
+        print(f"[image] cache hit: {fpath}")
+        return fpath
+
+    entry = _inflight.get(fpath)
+    if entry is None:
+        entry = _inflight[fpath] = [asyncio.create_task(_generate(model_name, prompt, fpath)), 0]
+    task = entry[0]
+    entry[1] += 1
+    try:
+        return await asyncio.shield(task)
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            # Son bekleyen de ayrıldı: sonuç alındıysa kaydı kaldır, alınmadıysa ücretli çağrıyı iptal et.
+            _inflight.pop(fpath, None)
+            task.cancel()
+
+
+async def _generate(model_name: str, prompt: str, fpath: str) -> str | None:
+    oa_client = openai_client()
+    if not oa_client:
+        print("[image] OpenAI client yok ya da API key eksik.")
+        return None
+
+    print(f"[image] trying model: {model_name}")
+
+    try:
+        # URL yanıtı (varsayılan) diske akıtılır; b64 yalnızca model onu döndürürse kullanılır.
+        async with _image_sem, OPENAI_LIMIT:
+            resp = await oa_client.images.generate(
+                model=model_name,
+                prompt=prompt,
+                size="1024x1024",
+                n=1,
+            )
+
+        url = getattr(resp.data[0], "url", None)
+        if url:
+            await _download_to(url, fpath)
+            print(f"[image] generated (url) with {model_name}: {fpath}")
+            _evict_old_images(keep=fpath)
+            return fpath
+
+        b64 = getattr(resp.data[0], "b64_json", None)
+        if b64:
+            _write_b64(b64, fpath)
+            print(f"[image] generated (b64) with {model_name}: {fpath}")
+            _evict_old_images(keep=fpath)
+            return fpath
+
+        print(f"[image] no b64/url in response: {resp}")
+        return None
+
+    except Exception as e:
+        print(f"[image] {model_name} failed: {e}")
+        traceback.print_exc()
+        return None
+
+
+_image_sem = asyncio.Semaphore(settings.IMAGE_CONCURRENCY)
+_inflight: Dict[str, list] = {}  # fpath -> [üretim task'ı, bekleyen sayısı]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+import asyncio
+
+from aiolimiter import AsyncLimiter
+
+from config import settings
+
+
+class ProviderLimit:
+    """
+    Per-provider admission control: a semaphore caps in-flight requests and a
+    token bucket caps the request rate, so bursts queue here instead of
+    turning into 429s and retry storms on the provider side.
+
+        async with OPENAI_LIMIT:
+            await client.chat.completions.create(...)
+    """
+
+    def __init__(self, concurrency: int, rate: float, period: float = 60.0):
+        self._sem = asyncio.Semaphore(concurrency)
+        self._bucket = AsyncLimiter(rate, period) if rate > 0 else None
+
+    async def __aenter__(self) -> "ProviderLimit":
+        await self._sem.acquire()
+        if self._bucket is not None:
+            try:
+                await self._bucket.acquire()
+            except BaseException:
+                self._sem.release()
+                raise
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._sem.release()
+
+
+OPENAI_LIMIT = ProviderLimit(settings.OPENAI_MAX_CONCURRENCY, settings.OPENAI_RPM)
+ANTHROPIC_LIMIT = ProviderLimit(settings.ANTHROPIC_MAX_CONCURRENCY, settings.ANTHROPIC_RPM)
+AMADEUS_LIMIT = ProviderLimit(settings.AMADEUS_MAX_CONCURRENCY, settings.AMADEUS_RPS, period=1.0)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+import atexit
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional
+
+import numpy as np
+
+Embedder = Callable[[str], Awaitable[List[float]]]
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable hash for JSON-serialisable request parts (model, params, messages...)."""
+    blob = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: exact-hash LRU first, then (optionally) an
+    embedding lookup restricted to entries that share the same context.
+
+    `context` should cover everything except the free-text query (model,
+    system prompt, tool output...) so a semantic hit never crosses into a
+    different prompt. Without an `embed` callable only the exact tier is used.
+    """
+
+    def __init__(self, embed: Optional[Embedder] = None, maxsize: int = 1024,
+                 threshold: float = 0.95, path: Optional[str] = None):
+        self.embed = embed
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.path = path
+        self._exact: "OrderedDict[str, str]" = OrderedDict()
+        self._vecs: Optional[np.ndarray] = None
+        self._ctx: List[str] = []
+        self._answers: List[str] = []
+        self._last: tuple = ("", None)  # get() ile put() arasında aynı sorguyu iki kez embed etme
+        self._load()
+        if self.path:
+            atexit.register(self.save)
+
+    async def get(self, key: str, context: str, query: str) -> Optional[str]:
+        hit = self._exact.get(key)
+        if hit is not None:
+            self._exact.move_to_end(key)
+            return hit
+        if not (self.embed and self._ctx and query):
+            return None
+        q = await self._embed(query)
+        if q is None:
+            return None
+        mask = np.fromiter((c == context for c in self._ctx), dtype=bool, count=len(self._ctx))
+        if not mask.any():
+            return None
+        sims = np.where(mask, self._vecs @ q, -1.0)
+        best = int(sims.argmax())
+        if sims[best] >= self.threshold:
+            return self._answers[best]
+        return None
+
+    async def put(self, key: str, context: str, query: str, response: str) -> None:
+        self._exact[key] = response
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+
+        if not (self.embed and query):
+            return
+        q = await self._embed(query)
+        if q is None:
+            return
+        self._vecs = q[None, :] if self._vecs is None else np.vstack([self._vecs, q])
+        self._ctx.append(context)
+        self._answers.append(response)
+        if len(self._ctx) > self.maxsize:
+            drop = len(self._ctx) - self.maxsize
+            self._vecs = self._vecs[drop:]
+            self._ctx = self._ctx[drop:]
+            self._answers = self._answers[drop:]
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self._last[0] == text and self._last[1] is not None:
+            return self._last[1]
+        try:
+            vec = np.asarray(await self.embed(text), dtype=np.float32)
+        except Exception as e:
+            print(f"[cache] embedding failed: {e}")
+            return None
+        norm = float(np.linalg.norm(vec))
+        if not norm or (self._vecs is not None and vec.shape[0] != self._vecs.shape[1]):
+            return None
+        vec = vec / norm
+        self._last = (text, vec)
+        return vec
+
+    def _load(self) -> None:
+        if not (self.path and os.path.exists(self.path)):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                for k, v in zip(data["exact_keys"].tolist(), data["exact_vals"].tolist()):
+                    self._exact[k] = v
+                if data["vecs"].size:
+                    self._vecs = data["vecs"].astype(np.float32)
+                    self._ctx = data["ctx"].tolist()
+                    self._answers = data["answers"].tolist()
+        except Exception as e:
+            print(f"[cache] could not load {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp.npz"
+            np.savez(
+                tmp,
+                exact_keys=np.array(list(self._exact.keys()), dtype=str),
+                exact_vals=np.array(list(self._exact.values()), dtype=str),
+                vecs=self._vecs if self._vecs is not None else np.zeros((0, 0), dtype=np.float32),
+                ctx=np.array(self._ctx, dtype=str),
+                answers=np.array(self._answers, dtype=str),
+            )
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[cache] could not save {self.path}: {e}")